@@ -1,22 +1,101 @@
+import argparse
 import os
-import imageio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+def _read_frame(path, max_width=None):
+    """decode a single rgb frame straight into a pillow image, downscaled to max_width"""
+    with Image.open(path) as img:
+        # drop alpha (transparent renders) right after decode, so resizing
+        # and quantizing only touch three channels
+        img = img.convert('RGB')
+    if max_width and img.width > max_width:
+        # quantization cost scales with pixel count, so shrink before encoding
+        height = round(img.height * max_width / img.width)
+        img = img.resize((max_width, height), Image.Resampling.LANCZOS)
+    return img
+
+def _iter_frames(paths, workers, max_width=None):
+    """yield decoded frames in order, prefetching a bounded window on a thread pool"""
+    # png decode releases the gil, so keep ~workers frames decoding ahead of
+    # the (single threaded) gif encoder
+    paths = iter(paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(_read_frame, p, max_width) for _, p in zip(range(workers), paths))
+        while pending:
+            img = pending.popleft().result()
+            for p in paths:
+                pending.append(pool.submit(_read_frame, p, max_width))
+                break
+            yield img
+
+def _build_palette(paths, max_width=None, samples=8):
+    """median-cut a 256 color palette from frames sampled evenly across the sweep"""
+    # the first frame alone only sees one side of the reflections, so stack a
+    # few frames from across the sweep into one montage and quantize that
+    n = min(samples, len(paths))
+    picked = [_read_frame(paths[k * len(paths) // n], max_width) for k in range(n)]
+    montage = Image.new('RGB', (max(img.width for img in picked), sum(img.height for img in picked)))
+    y = 0
+    for img in picked:
+        montage.paste(img, (0, y))
+        y += img.height
+    return montage.quantize(256, method=Image.Quantize.MEDIANCUT)
 
 def make_gif(
     folder: str = 'output/cube/train',
     out: str = 'train.gif',
-    duration: float = 0.1
+    duration: float = 0.1,
+    workers: int = None,
+    max_width: int = 512,
+    dither: bool = False
 ):
     """load images from folder (alphabetical) and save as a looping gif."""
     files = sorted(
         f for f in os.listdir(folder)
         if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))
     )
-    images = [
-        imageio.imread(os.path.join(folder, f))[:, :, :3]
-        for f in files
-    ]
-    imageio.mimsave(out, images, duration=duration)
-    print(f'saved gif to {out} ({len(images)} frames @ {duration}s/frame)')
+    if not files:
+        print(f'warning: no images found in {folder}')
+        return
+    workers = workers or min(8, os.cpu_count() or 1, len(files))
+    paths = [os.path.join(folder, f) for f in files]
+
+    # every frame comes from the same render, so build one palette up front
+    # and map each frame onto it instead of re-quantizing. dithering is opt-in,
+    # the montage palette already covers the sweep and dithering is several
+    # times slower to quantize and makes bigger files. frames stay pillow
+    # images end to end, so no per-frame numpy arrays are allocated and copied
+    # on the way into the quantizer
+    palette = _build_palette(paths, max_width)
+    dither_mode = Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE
+    frames = (
+        img.quantize(palette=palette, dither=dither_mode)
+        for img in _iter_frames(paths, workers, max_width)
+    )
+    # pillow's gif writer keeps every paletted frame (~1 byte/pixel) until
+    # save() finishes, so memory still grows with frame count. decoded rgb
+    # frames (3 bytes/pixel) only live inside the prefetch window though, which
+    # is why they are not collected into one preallocated (N, H, W, 3) buffer
+    first = next(frames)
+    first.save(
+        out, save_all=True, append_images=frames,
+        duration=int(duration * 1000), loop=0
+    )
+    print(f'saved gif to {out} ({len(files)} frames @ {duration}s/frame)')
+
+def main():
+    """command line entry point, so the encoder can run as its own process"""
+    parser = argparse.ArgumentParser(description='encode a folder of frames into a looping gif')
+    parser.add_argument('--folder', default='output/cube/train', help='folder of frames (alphabetical)')
+    parser.add_argument('--out', default='train.gif', help='output gif path')
+    parser.add_argument('--duration', type=float, default=0.1, help='seconds per frame')
+    parser.add_argument('--workers', type=int, default=None, help='decode threads')
+    parser.add_argument('--max-width', type=int, default=512, help='downscale wider frames, 0 keeps full size')
+    parser.add_argument('--dither', action='store_true', help='floyd-steinberg dither onto the palette (slower, bigger)')
+    args = parser.parse_args()
+    make_gif(args.folder, args.out, args.duration, args.workers, args.max_width or None, args.dither)
 
 if __name__ == '__main__':
-    make_gif()
+    main()
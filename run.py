@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 
@@ -8,7 +9,19 @@ if current_dir not in sys.path:
 
 from scripts.distorted_cube import load_config, render_cube
 
+def parse_args():
+    """parse the arguments blender passes through after '--'"""
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="render the dataset (or one shard of it)")
+    parser.add_argument("--start", type=int, default=0, help="first frame index to render")
+    parser.add_argument("--end", type=int, default=None, help="one past the last frame index to render")
+    parser.add_argument("--device", choices=("auto", "cpu"), default="auto", help="auto uses every gpu found, else the cpu")
+    parser.add_argument("--gpu-index", type=int, default=None, help="only render on this gpu")
+    return parser.parse_args(argv)
+
 def main():
+    args = parse_args()
+
     # get the absolute path to the config file
     config_path = os.path.join(current_dir, "configs", "distorted_cube.yaml")
     
@@ -21,9 +34,11 @@ def main():
     
     # load the config
     config = load_config(config_path)
+    config["output"]["device"] = args.device
+    config["output"]["gpu_index"] = args.gpu_index
     
     # render the cube directly to train and test folders
-    render_cube(config, train_ratio=0.33)
+    render_cube(config, train_ratio=0.33, start=args.start, end=args.end)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
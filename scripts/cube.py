@@ -1,12 +1,25 @@
 import bpy
 import math
 import os
-import json
-from mathutils import Vector
+import sys
+import shutil
+import tempfile
+from mathutils import Matrix
 import yaml
 import inspect
 import numpy as np
 
+# + the project root to the front of python's path, so utils/ resolves when
+# run directly and isn't shadowed by a utils package in blender's site-packages
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_dir in sys.path:
+    sys.path.remove(project_dir)
+sys.path.insert(0, project_dir)
+
+from utils.jsonio import write_json
+from utils.blender import load_hdri, setup_device
+from utils.camera import look_at_matrices
+
 def load_config(config_path):
     """load configuration from yaml file"""
     with open(config_path, "r") as f:
@@ -26,8 +39,31 @@ def setup_scene(config):
     bpy.context.scene.render.resolution_y = resolution[1]
     bpy.context.scene.render.image_settings.file_format = config["output"]["format"]
     bpy.context.scene.cycles.samples = config["output"]["samples"]
+
+    # low sample counts + denoising instead of brute-forcing the noise away
+    denoiser = config["output"].get("denoiser", "OPENIMAGEDENOISE")
+    bpy.context.scene.cycles.use_denoising = bool(denoiser)
+    if denoiser:
+        bpy.context.scene.cycles.denoiser = denoiser
+        bpy.context.scene.cycles.denoising_input_passes = 'RGB_ALBEDO_NORMAL'
     bpy.context.scene.render.film_transparent = True # <-- make background transparent like NeRO
 
+    # only keep alpha when the background is transparent and the format can
+    # store it (jpeg/bmp only offer BW/RGB), and write fast 8-bit pngs
+    # (depth/compression don't apply to other formats like exr)
+    image_settings = bpy.context.scene.render.image_settings
+    has_alpha = image_settings.file_format in ('PNG', 'TIFF', 'OPEN_EXR', 'TARGA')
+    image_settings.color_mode = 'RGBA' if bpy.context.scene.render.film_transparent and has_alpha else 'RGB'
+    if image_settings.file_format == 'PNG':
+        image_settings.color_depth = '8'
+        image_settings.compression = config["output"].get("compression", 15) # <-- 0-100, lower = faster
+
+    # only the camera moves, so keep the bvh and textures between frames
+    bpy.context.scene.render.use_persistent_data = True
+    bpy.context.scene.cycles.debug_use_spatial_splits = False
+    bpy.context.scene.cycles.tile_size = 2048
+    setup_device(config)
+
 def create_cube(config):
     """create a shiny cube based on config"""
     # create a cube
@@ -105,7 +141,7 @@ def setup_environment(config):
 
     # add environment texture node
     env_tex = world_nodes.new(type='ShaderNodeTexEnvironment')
-    env_tex.image = bpy.data.images.load(config["environment"]["hdri_path"])
+    env_tex.image = load_hdri(config["environment"]["hdri_path"])
     env_tex.location = (-300, 0)
 
     # add background node
@@ -120,8 +156,12 @@ def setup_environment(config):
     world_links.new(env_tex.outputs['Color'], background.inputs['Color'])
     world_links.new(background.outputs['Background'], world_output.inputs['Surface'])
 
-def render_cube(config, train_ratio):
-    """render objects and save to train and test folders based on script name"""
+def render_cube(config, train_ratio, start=0, end=None):
+    """render objects and save to train and test folders based on script name
+
+    only frames in [start, end) are rendered, so a sweep can be sharded
+    across several blender processes
+    """
     # get script name for folder name
     folder_name = os.path.splitext(os.path.basename(inspect.getfile(inspect.currentframe())))[0]
     
@@ -149,7 +189,7 @@ def render_cube(config, train_ratio):
     # calculate camera parameters
     camera_data = camera.data
     camera_angle_x = camera_data.angle_x
-    target = Vector(tuple(config["cube"]["location"]))
+    target = np.asarray(config["cube"]["location"], dtype=np.float64)
 
     # render settings
     num_images = config["camera"]["num_images"]
@@ -165,59 +205,77 @@ def render_cube(config, train_ratio):
     phis = (i * phi_g) % (2*np.pi)                  # azimuth array of length N
     rotation_step = phi_g                           # store the same for every frame
 
+    # spherical --> cartesian, then point every camera at the target in one go
+    r = distance
+    cam_pos = np.stack([
+        r * np.sin(thetas) * np.cos(phis),
+        r * np.sin(thetas) * np.sin(phis),
+        r * np.cos(thetas),
+    ], axis=-1)
+    # one (N, 4, 4) float32 block instead of a python list per frame
+    transform_matrices = look_at_matrices(cam_pos, target).astype(np.float32)
+
     num_train = round(num_images * train_ratio)
     stride    = round(num_images / num_train)       # e.g. if train_ratio=1/3 on N=300 → stride=3
 
-    ntrain = ntest = 0
-    train_camera_params = []
-    test_camera_params  = []
-
-    for i in range(num_images):
-        # pick out this frame's elevation and azimuth
-        theta = thetas[i]
-        phi = phis[i]
-
-        # spherical --> cartesian
-        r = distance
-        z_cam = r * np.cos(theta)
-        x = r * np.sin(theta) * np.cos(phi)
-        y = r * np.sin(theta) * np.sin(phi)
-
-        camera.location = (x, y, z_cam)
-
-        # point at origin
-        direction = target - camera.location
-        rot_quat = direction.to_track_quat('-Z', 'Y')
-        camera.rotation_euler = rot_quat.to_euler()
-
-        # build frame dict & decide train vs test by i % stride
-        frame = {
-            "file_path": f"train/r_{ntrain}" if i % stride == 0 else f"test/r_{ntest}",
-            "rotation": rotation_step,
-            "transform_matrix": [list(row) for row in camera.matrix_world],
-            "camera_angle_x": camera_angle_x
-        }
-
-        if i % stride == 0:
-            train_camera_params.append(frame);  ntrain += 1
-            out_dir = train_dir;  fname = f"r_{ntrain-1}"
-        else:
-            test_camera_params.append(frame);   ntest  += 1
-            out_dir = test_dir;   fname = f"r_{ntest-1}"
-
-        # render & save
-        bpy.context.scene.render.filepath = os.path.join(out_dir, f"{fname}.png")
-        bpy.ops.render.render(write_still=True)
+    # decide train vs test for the whole sweep up front, so the frame loop has
+    # no branches and file indices stay global when the sweep is sharded
+    is_train = np.arange(num_images) % stride == 0
+    split_idx = np.where(is_train, np.cumsum(is_train), np.cumsum(~is_train)) - 1
+    file_paths = [
+        f"train/r_{k}" if t else f"test/r_{k}"
+        for t, k in zip(is_train.tolist(), split_idx.tolist())
+    ]
+
+    end = num_images if end is None else end
+
+    # bind rna lookups once instead of crossing python --> rna every frame
+    scene = bpy.context.scene
+    insert_key = camera.keyframe_insert
+
+    for i in range(start, end):
+        # keyframe this pose so the whole sweep renders as one animation
+        camera.matrix_world = Matrix(transform_matrices[i].tolist())
+        insert_key(data_path="location", frame=i + 1)
+        insert_key(data_path="rotation_euler", frame=i + 1)
+
+    # render all frames in one go so cycles reuses the scene sync between frames
+    scene.frame_start = start + 1
+    scene.frame_end = end
+    # stage the numbered frames next to (not inside) the dataset folder, one
+    # dir per shard on the same filesystem so os.replace stays a cheap rename
+    frames_dir = tempfile.mkdtemp(prefix=f".{folder_name}_frames_{start}_{end}_", dir=output_dir)
+    try:
+        scene.render.filepath = os.path.join(frames_dir, "r_####")
+        bpy.ops.render.render(animation=True)
+
+        # move the numbered frames into their train/test slots
+        frame_path = scene.render.frame_path
+        for i in range(start, end):
+            os.replace(frame_path(frame=i + 1), os.path.join(object_dir, f"{file_paths[i]}.png"))
+    finally:
+        shutil.rmtree(frames_dir, ignore_errors=True)
+
+    shard_is_train = is_train[start:end]
+    train_idx = np.flatnonzero(shard_is_train) + start
+    test_idx = np.flatnonzero(~shard_is_train) + start
     
-    # create transform json files
-    create_transform_json(config, train_camera_params, "transforms_train.json", folder_name)
-    create_transform_json(config, test_camera_params, "transforms_test.json", folder_name)
+    # create transform json files, tagged with the frame range when sharded
+    shard = "" if (start, end) == (0, num_images) else f"_{start}_{end}"
+    for split, idx in (("train", train_idx), ("test", test_idx)):
+        create_transform_json(
+            config, [file_paths[k] for k in idx], transform_matrices[idx], rotation_step,
+            f"transforms_{split}{shard}.json", folder_name, camera_angle_x
+        )
     
-    print(f"finished rendering {num_images} images ({ntrain} train, {ntest} test)")
+    print(f"finished rendering {end - start} images ({len(train_idx)} train, {len(test_idx)} test)")
 
-def create_transform_json(config, camera_params, output_filename, folder_name):
-    """create transform.json file in nero dataset format"""
-    if not camera_params:
+def create_transform_json(config, file_paths, transform_matrices, rotation, output_filename, folder_name, camera_angle_x):
+    """create transform.json file in nero dataset format
+
+    file_paths[k] pairs with transform_matrices[k], an (N, 4, 4) array
+    """
+    if not file_paths:
         print(f"warning: no camera parameters for {output_filename}")
         return
         
@@ -225,25 +283,22 @@ def create_transform_json(config, camera_params, output_filename, folder_name):
     output_dir = config["output"]["directory"]
     object_dir = os.path.join(output_dir, folder_name)
     
-    # create transform data
+    # create transform data, frame dicts are only built here at serialization time
     transform_data = {
-        "camera_angle_x": camera_params[0]["camera_angle_x"],
-        "frames": []
+        "camera_angle_x": camera_angle_x,
+        "frames": [
+            {
+                "file_path": file_path,
+                "rotation": rotation,
+                "transform_matrix": matrix
+            }
+            for file_path, matrix in zip(file_paths, transform_matrices)
+        ]
     }
     
-    # add frames data
-    for params in camera_params:
-        frame_data = {
-            "file_path": params["file_path"],
-            "rotation": params["rotation"],
-            "transform_matrix": params["transform_matrix"]
-        }
-        transform_data["frames"].append(frame_data)
-    
     # save json file
     transform_json_path = os.path.join(object_dir, output_filename)
-    with open(transform_json_path, "w") as f:
-        json.dump(transform_data, f, indent=4)
+    write_json(transform_json_path, transform_data)
     
     print(f"saved {output_filename} to {transform_json_path}")
 
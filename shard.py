@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import yaml
+
+from utils.jsonio import write_json
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+def launch_shards(blender, num_images, shards, threads, gpus=None):
+    """render disjoint frame ranges in parallel background blender processes
+
+    with gpus set, shard k renders on gpu k % gpus only, otherwise every
+    shard is forced onto the cpu so they don't all share the same gpus
+    """
+    bounds = [num_images * k // shards for k in range(shards + 1)]
+    ranges = [(s, e) for s, e in zip(bounds[:-1], bounds[1:]) if e > s]
+    procs = []
+    for k, (s, e) in enumerate(ranges):
+        device = ["--gpu-index", str(k % gpus)] if gpus else ["--device", "cpu"]
+        procs.append(subprocess.Popen(
+            [blender, "--background", "--python-exit-code", "1", "--threads", str(threads),
+             "--python", "run.py", "--", "--start", str(s), "--end", str(e), *device],
+            cwd=current_dir,
+        ))
+    failed = [r for r, p in zip(ranges, procs) if p.wait() != 0]
+    if failed:
+        raise RuntimeError(f"blender failed on frame ranges {failed}")
+    return ranges
+
+def merge_transforms(object_dir, split, ranges):
+    """merge per-shard transforms_<split>_<start>_<end>.json files into one"""
+    merged = None
+    for s, e in ranges:
+        shard_path = os.path.join(object_dir, f"transforms_{split}_{s}_{e}.json")
+        if not os.path.exists(shard_path):  # <-- shard had no frames for this split
+            continue
+        with open(shard_path, "r") as f:
+            data = json.load(f)
+        if merged is None:
+            merged = data
+        else:
+            merged["frames"].extend(data["frames"])
+        os.remove(shard_path)
+
+    if merged is None:
+        print(f"warning: no shards produced transforms_{split}.json")
+        return
+    out_path = os.path.join(object_dir, f"transforms_{split}.json")
+    write_json(out_path, merged)
+    print(f"saved transforms_{split}.json to {out_path} ({len(merged['frames'])} frames)")
+
+def spawn_gif(folder, out):
+    """encode a gif from the rendered frames in a detached process and return right away"""
+    # the frames on disk are the handoff point, so the encoder never competes
+    # with this driver (or the next render job) for its lifetime
+    subprocess.Popen(
+        [sys.executable, os.path.join(current_dir, "mgif.py"), "--folder", folder, "--out", out],
+        cwd=current_dir, start_new_session=True,
+    )
+    print(f"encoding {out} in the background")
+
+def main():
+    parser = argparse.ArgumentParser(description="shard run.py's camera sweep across blender processes")
+    parser.add_argument("--blender", default="blender", help="path to the blender executable")
+    parser.add_argument("--threads", type=int, default=4, help="render threads per blender process (cpu rendering)")
+    parser.add_argument("--gpus", type=int, default=None, help="render on this many gpus, one shard per gpu (default: cpu only)")
+    parser.add_argument("--shards", type=int, default=None, help="number of blender processes (default: gpus, else cpus // threads)")
+    parser.add_argument("--gif", default=None, help="also encode the train frames to this gif in the background")
+    args = parser.parse_args()
+
+    # same config and output folder as run.py
+    with open(os.path.join(current_dir, "configs", "distorted_cube.yaml"), "r") as f:
+        config = yaml.safe_load(f)
+    num_images = config["camera"]["num_images"]
+    object_dir = os.path.join(current_dir, config["output"]["directory"], "distorted_cube")
+
+    shards = args.shards or args.gpus or max(1, (os.cpu_count() or 1) // args.threads)
+    ranges = launch_shards(args.blender, num_images, shards, args.threads, args.gpus)
+    if len(ranges) > 1:  # <-- a single shard already wrote the final json files
+        for split in ("train", "test"):
+            merge_transforms(object_dir, split, ranges)
+    if args.gif:
+        spawn_gif(os.path.join(object_dir, "train"), os.path.abspath(args.gif))  # <-- child runs from the repo root
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import bpy
+
+def setup_device(config):
+    """render on every available gpu (optix, then cuda), falling back to the cpu
+
+    output.device = "CPU" forces cpu rendering, and output.gpu_index pins
+    this process to a single gpu (used by shard.py, one shard per gpu)
+    """
+    cycles_prefs = bpy.context.preferences.addons["cycles"].preferences
+    if config["output"].get("device", "AUTO").upper() == "CPU":
+        bpy.context.scene.cycles.device = 'CPU'
+        print("rendering on cpu")
+        return
+
+    gpus = []
+    for device_type in ("OPTIX", "CUDA"):
+        try:
+            cycles_prefs.compute_device_type = device_type
+        except TypeError:  # <-- backend not compiled into this blender build
+            continue
+        cycles_prefs.get_devices()
+        gpus = [d for d in cycles_prefs.devices if d.type == device_type]
+        if gpus:
+            break
+
+    gpu_index = config["output"].get("gpu_index")
+    if gpu_index is not None and gpus:
+        gpus = [gpus[gpu_index % len(gpus)]]
+    for device in cycles_prefs.devices:
+        device.use = device in gpus
+    bpy.context.scene.cycles.device = 'GPU' if gpus else 'CPU'
+    print(f"rendering on {', '.join(d.name for d in gpus) if gpus else 'cpu'}")
+
+def load_hdri(path):
+    """load an hdri once per session and re-bind the decoded image afterwards
+
+    setup_scene resets bpy.data via read_factory_settings, so the reuse only
+    helps callers that set up the environment again without calling it
+    """
+    image = bpy.data.images.get(os.path.basename(path))
+    # bpy.path.abspath only expands '//' paths, so resolve relative ones too
+    if image is None or os.path.abspath(bpy.path.abspath(image.filepath)) != os.path.abspath(path):
+        image = bpy.data.images.load(path, check_existing=True)
+    if not image.use_fake_user:  # <-- first load, pin it so it is not freed between setups
+        image.use_fake_user = True
+        image.colorspace_settings.name = 'Linear Rec.709'
+    return image
@@ -0,0 +1,22 @@
+import numpy as np
+
+def look_at_matrices(cam_pos, target):
+    """build (N, 4, 4) camera-to-world matrices looking from cam_pos at target"""
+    # blender cameras look down -Z with +Y up, same as to_track_quat('-Z', 'Y')
+    forward = target - cam_pos
+    forward /= np.linalg.norm(forward, axis=-1, keepdims=True)
+    right = np.cross(forward, np.array([0.0, 0.0, 1.0]))
+    norm = np.linalg.norm(right, axis=-1, keepdims=True)
+
+    # looking straight down the world up axis, fall back to +X as right
+    degenerate = norm[:, 0] < 1e-8
+    right[degenerate] = (1.0, 0.0, 0.0)
+    norm[degenerate] = 1.0
+    right /= norm
+    up = np.cross(right, forward)
+
+    matrices = np.zeros((len(cam_pos), 4, 4))
+    matrices[:, :3, :3] = np.stack([right, up, -forward], axis=-1)
+    matrices[:, :3, 3] = cam_pos
+    matrices[:, 3, 3] = 1.0
+    return matrices
@@ -0,0 +1,15 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # <-- optional, only makes large json files faster to write
+    orjson = None
+
+def write_json(path, data):
+    """write json with orjson when it is installed, else the stdlib json"""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2, default=lambda o: o.tolist())  # <-- numpy arrays